@@ -1,12 +1,22 @@
 import streamlit as st
 import fitz  # PyMuPDF
 import google.generativeai as genai
+from google import genai as google_genai
+import gtts.tts
 from gtts import gTTS
-import tempfile
+import requests
+from requests.adapters import HTTPAdapter
+import hashlib
+import io
 import os
 from dotenv import load_dotenv
 from streamlit_lottie import st_lottie
 import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Theme & Configuration ---
 # Color palette
@@ -16,6 +26,63 @@ ACCENT_COLOR = "#F72585"
 BG_COLOR = "#F8F9FA"
 TEXT_COLOR = "#212529"
 
+# Upload limits that bound PDF parsing time and memory
+MAX_PDF_BYTES = 5_000_000
+MAX_PDF_PAGES = 20
+
+# Audio summary length
+AUDIO_SUMMARY_CHARS = 500
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+
+class _SharedGTTSSession:
+    """Hands gTTS the shared session without letting its ``with`` block close it."""
+
+    def __enter__(self):
+        return _gtts_session()
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _GTTSRequests:
+    """Stands in for ``requests`` inside gtts.tts, which opens a new Session per call."""
+    Session = _SharedGTTSSession
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+@st.cache_resource
+def _gtts_session():
+    """Returns the keep-alive session shared by all gTTS calls, sized to match _get_tts_executor().
+
+    Also patches gtts.tts to use it, so both happen once per process rather than on every rerun.
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=2))
+    gtts.tts.requests = _GTTSRequests()
+    return session
+
+
+# Number of completed analyses kept in memory
+ANALYSIS_CACHE_SIZE = 64
+
+# Character budgets (resume, job description) sent to Gemini per analysis type
+_BUDGETS = {
+    "missing_keywords": (2000, 1500),
+    "match_ats": (4000, 3000),
+    "market_insights": (1000, 4000),
+    "career_path": (6000, 1000),
+    "default": (6000, 4000),
+}
+
+# Gemini Batch API settings for multi-analysis runs
+BATCH_MODEL = "models/gemini-2.5-flash"
+_BATCH_POLL_SECONDS = 10
+_BATCH_TIMEOUT_SECONDS = 6 * 60 * 60
+_BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
 
 # --- Helper Functions ---
 def load_dotenv_config():
@@ -28,49 +95,287 @@ def load_dotenv_config():
     return False
 
 
-def get_gemini_response(input_prompt, pdf_content, job_desc):
-    """Generates content using the Gemini model."""
+@st.cache_resource
+def _get_executor():
+    """Returns the worker pool, shared by all sessions, used to synthesize audio off the main thread."""
+    return ThreadPoolExecutor(max_workers=2)
+
+
+@st.cache_resource
+def _get_tts_executor():
+    """Returns the shared pool for per-sentence TTS.
+
+    Separate from _get_executor() so speak_text can fan out from one of its workers without deadlocking.
+    """
+    return ThreadPoolExecutor(max_workers=4)
+
+
+class ContentBlockedError(Exception):
+    """Raised when Gemini refuses to generate content for a prompt."""
+
+
+@st.cache_resource
+def _get_model():
+    """Returns a shared Gemini model instance."""
+    return genai.GenerativeModel('gemini-1.5-flash')
+
+
+@st.cache_resource
+def _analysis_cache():
+    """Returns the shared LRU store of completed analyses, keyed by their inputs, and its lock.
+
+    A plain store rather than st.cache_data, since streaming renders into a
+    placeholder created outside the function, which cache replay rejects. The
+    lock lives here too, so every session and rerun guards the store with the same one.
+    """
+    return OrderedDict(), threading.Lock()
+
+
+def _generate_analysis(input_prompt, pdf_content, job_desc, on_chunk=None):
+    """Streams a Gemini analysis, passing the text so far to ``on_chunk``. Raises on failure."""
+    response = _get_model().generate_content([input_prompt, pdf_content, job_desc], stream=True)
+    text = ""
+    for chunk in response:
+        # A blocked prompt arrives as a chunk without parts, whose .text accessor raises
+        if chunk.prompt_feedback.block_reason:
+            raise ContentBlockedError(
+                f"🚫 Content generation blocked: {chunk.prompt_feedback.block_reason_message}")
+        if not chunk.parts:
+            continue
+        text += chunk.text
+        if on_chunk:
+            on_chunk(text)
+    if response.prompt_feedback.block_reason:
+        raise ContentBlockedError(
+            f"🚫 Content generation blocked: {response.prompt_feedback.block_reason_message}")
+    if not text:
+        raise ValueError("Gemini returned an empty response")
+    return text
+
+
+def _truncate(text, limit):
+    """Cuts text to at most ``limit`` chars, preferring the last sentence or line break."""
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    cut = max(head.rfind(". "), head.rfind("! "), head.rfind("? "), head.rfind("\n"))
+    # Fall back to a hard cut rather than discarding most of the budget
+    return head[:cut + 1] if cut > limit // 2 else head
+
+
+def fit_to_budget(option, pdf_content, job_desc):
+    """Truncates resume and job description to the budget for an analysis type."""
+    resume_limit, jd_limit = _BUDGETS.get(option, _BUDGETS["default"])
+    return _truncate(pdf_content, resume_limit), _truncate(job_desc, jd_limit)
+
+
+def get_gemini_response(input_prompt, pdf_content, job_desc, option=None, on_chunk=None):
+    """Generates content using the Gemini model. Returns a (text, error) tuple."""
+    pdf_content, job_desc = fit_to_budget(option, pdf_content, job_desc)
+    cache, cache_lock = _analysis_cache()
+    key = (input_prompt, pdf_content, job_desc)
+    with cache_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key], None
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content([input_prompt, pdf_content, job_desc])
-        if response.prompt_feedback.block_reason:
-            st.error(f"🚫 Content generation blocked: {response.prompt_feedback.block_reason_message}")
-            return None
-        return response.text
+        text = _generate_analysis(input_prompt, pdf_content, job_desc, on_chunk)
+        # Only successful results are stored, so transient errors are retried
+        with cache_lock:
+            cache[key] = text
+            while len(cache) > ANALYSIS_CACHE_SIZE:
+                cache.popitem(last=False)
+        return text, None
+    except ContentBlockedError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"🔴 Error interacting with Gemini API: {e}"
+
+
+@st.cache_resource
+def _get_batch_client():
+    """Returns a shared google-genai client for the Batch API."""
+    return google_genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+
+def submit_batch_analysis(options, pdf_content, job_desc):
+    """Submits several analyses as one inline Gemini batch job. Returns a (job_name, error) tuple."""
+    inline_requests = []
+    for option in options:
+        resume_text, jd_text = fit_to_budget(option, pdf_content, job_desc)
+        inline_requests.append(
+            {'contents': [{'parts': [{'text': _STATIC_PROMPTS[option]}, {'text': resume_text}, {'text': jd_text}],
+                           'role': 'user'}]}
+        )
+    try:
+        job = _get_batch_client().batches.create(
+            model=BATCH_MODEL,
+            src=inline_requests,
+            config={'display_name': 'jobfit-analysis'}
+        )
+        return job.name, None
+    except Exception as e:
+        return None, f"🔴 Error submitting batch job: {e}"
+
+
+def check_batch_analysis(job_name, options):
+    """Fetches a batch job's state once, without waiting.
+
+    Returns a (state, {option: text}, error) tuple; results stay None until the
+    job finishes, and state is None if the job could not be fetched.
+    """
+    try:
+        job = _get_batch_client().batches.get(name=job_name)
     except Exception as e:
-        st.error(f"🔴 Error interacting with Gemini API: {e}")
+        return None, None, f"🔴 Error checking batch job: {e}"
+    state = job.state.name
+    if state not in _BATCH_DONE_STATES:
+        return state, None, None
+    if state != "JOB_STATE_SUCCEEDED":
+        return state, None, f"🔴 Batch job ended with state {state}"
+    results = {}
+    for option, inline in zip(options, job.dest.inlined_responses):
+        # .text is None when a response has no candidates, e.g. when it was blocked
+        text = inline.response.text if inline.response else None
+        results[option] = text or f"🔴 Error: {inline.error or 'no content was returned'}"
+    return state, results, None
+
+
+def cancel_batch_analysis(job_name):
+    """Cancels a running batch job. Returns an error message, or None on success."""
+    try:
+        _get_batch_client().batches.cancel(name=job_name)
         return None
+    except Exception as e:
+        return f"🔴 Error cancelling batch job: {e}"
+
+
+def discard_batch_job():
+    """Cancels any still-running batch job and clears its session state."""
+    if st.session_state.batch_job_name and not st.session_state.batch_results:
+        # Shown by render_batch_results, since this can run just before a rerun
+        st.session_state.batch_error = cancel_batch_analysis(st.session_state.batch_job_name)
+    st.session_state.batch_job_name = None
+    st.session_state.batch_submitted_at = None
+    st.session_state.batch_results = None
+
+
+def poll_batch_job():
+    """Checks a pending batch job once and reruns the app when it stops being pending.
+
+    Run as a timed fragment only while a job is pending, so polling refreshes
+    just this panel and never blocks the rest of Step 2.
+    """
+    if not st.session_state.batch_job_name or st.session_state.batch_results:
+        return
+    if time.time() - st.session_state.batch_submitted_at > _BATCH_TIMEOUT_SECONDS:
+        discard_batch_job()
+        st.session_state.batch_error = "🔴 Batch job took too long and was cancelled. Please try again."
+        st.rerun()
+
+    state, results, error = check_batch_analysis(
+        st.session_state.batch_job_name,
+        st.session_state.batch_options
+    )
+    if error and state is None:
+        # Transient fetch failure: keep the job and retry on the next run
+        st.warning(error)
+        return
+    if error:
+        st.session_state.batch_job_name = None
+        st.session_state.batch_error = error
+        st.rerun()
+    if results is None:
+        st.info(f"⏳ Batch job {state}. Results will appear here when it finishes.")
+        if st.button("Cancel batch job", use_container_width=True):
+            discard_batch_job()
+            st.rerun()
+        return
+    st.session_state.batch_results = results
+    st.rerun()
+
+
+def render_batch_results(analysis_options):
+    """Shows the last batch error once, and finished batch results as tabs."""
+    if st.session_state.batch_error:
+        st.error(st.session_state.batch_error)
+        st.session_state.batch_error = None
+
+    if st.session_state.batch_results:
+        tabs = st.tabs([analysis_options[option_key]['title'] for option_key in st.session_state.batch_results])
+        for tab, text in zip(tabs, st.session_state.batch_results.values()):
+            with tab:
+                st.markdown("<div class='result-card'>", unsafe_allow_html=True)
+                st.markdown(text)
+                st.markdown("</div>", unsafe_allow_html=True)
 
 
 def extract_pdf_text(uploaded_file):
-    """Extracts text from an uploaded PDF file."""
+    """Extracts text from an uploaded PDF file, skipping the parse if the bytes are unchanged."""
     if uploaded_file is not None:
+        if uploaded_file.size > MAX_PDF_BYTES:
+            st.error(f"🔴 PDF too large (>{MAX_PDF_BYTES // 1_000_000}MB)")
+            return None
         try:
-            document = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-            text_parts = [page.get_text() for page in document]
-            return " ".join(text_parts)
+            raw = uploaded_file.getvalue()
+            pdf_hash = hashlib.blake2b(raw, digest_size=16).digest()
+            if st.session_state.get('_pdf_hash') == pdf_hash and st.session_state.resume_content:
+                return st.session_state.resume_content
+            with fitz.open(stream=raw, filetype="pdf") as document:
+                page_count = document.page_count
+                if page_count > MAX_PDF_PAGES:
+                    st.warning(f"⚠️ Truncating to the first {MAX_PDF_PAGES} pages")
+                    page_count = MAX_PDF_PAGES
+                text = " ".join(document[i].get_text("text", sort=False) for i in range(page_count))
+            if not text.strip():
+                st.error("🔴 No text found in the PDF. Scanned or image-only resumes are not supported.")
+                return None
+            st.session_state._pdf_hash = pdf_hash
+            return text
         except Exception as e:
             st.error(f"🔴 Error processing PDF file: {e}")
             return None
     return None
 
 
+def _synthesize(sentence):
+    """Generates mp3 bytes for a single sentence using gTTS."""
+    _gtts_session()  # make sure gtts.tts has been patched to use the shared session
+    buf = io.BytesIO()
+    gTTS(text=sentence, lang='en').write_to_fp(buf)
+    return buf.getvalue()
+
+
+def iter_speech_chunks(text):
+    """Synthesizes sentences concurrently, yielding their mp3 bytes in order as each becomes ready."""
+    sentences = [s for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+    futures = [_get_tts_executor().submit(_synthesize, sentence) for sentence in sentences]
+    for future in futures:
+        yield future.result()
+
+
+@st.cache_data(show_spinner=False, max_entries=ANALYSIS_CACHE_SIZE)
+def _tts_for(snippet):
+    """Returns mp3 bytes for a snippet; cached so a summary is synthesized once across reruns."""
+    # MP3 frames are concatenation-safe, so per-sentence clips join into one stream
+    return b"".join(iter_speech_chunks(snippet))
+
+
 def speak_text(text):
-    """Generates audio from text using gTTS and saves to a temporary file."""
+    """Generates mp3 audio bytes from text using gTTS. Returns an (audio, error) tuple.
+
+    Reports errors instead of calling st.error, since it also runs on _get_executor() threads
+    where Streamlit elements are silently dropped.
+    """
     if not text:
-        return None
+        return None, None
     try:
-        tts = gTTS(text=text, lang='en')
-        temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-        tts.save(temp_audio.name)
-        audio_path = temp_audio.name
-        temp_audio.close()
-        return audio_path
+        return _tts_for(text), None
     except Exception as e:
-        st.error(f"🔴 Error generating audio: {e}")
-        return None
+        return None, f"🔴 Error generating audio: {e}"
 
 
+@st.cache_resource
 def load_lottie_animation(filepath):
     """Loads a Lottie animation JSON file."""
     try:
@@ -81,19 +386,147 @@ def load_lottie_animation(filepath):
         return None
 
 
-def cleanup_temp_file(file_path):
-    """Safely delete temporary files."""
-    if file_path and os.path.exists(file_path):
-        try:
-            os.unlink(file_path)
-        except Exception:
-            pass
+@st.cache_data
+def _css():
+    """Builds the app stylesheet from the theme colors."""
+    return f"""
+    <style>
+        :root {{
+            --primary-color: {PRIMARY_COLOR};
+            --secondary-color: {SECONDARY_COLOR};
+            --accent-color: {ACCENT_COLOR};
+            --background-color: {BG_COLOR};
+            --text-color: {TEXT_COLOR};
+        }}
+
+        .stApp {{
+            background-color: var(--background-color);
+            color: var(--text-color);
+        }}
+
+        h1, h2, h3 {{
+            color: var(--primary-color);
+        }}
+
+        .step-container {{
+            padding: 1rem;
+            border-radius: 10px;
+            margin-bottom: 1rem;
+            transition: all 0.3s ease;
+        }}
+
+        .step-active {{
+            background-color: rgba(67, 97, 238, 0.1);
+            border-left: 5px solid var(--primary-color);
+        }}
+
+        .step-completed {{
+            opacity: 0.7;
+        }}
+
+        .step-heading {{
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+        }}
+
+        .upload-area {{
+            border: 2px dashed rgba(67, 97, 238, 0.3);
+            border-radius: 10px;
+            padding: 2rem;
+            text-align: center;
+            transition: all 0.3s ease;
+        }}
+
+        .upload-area:hover {{
+            border-color: var(--primary-color);
+        }}
+
+        .result-card {{
+            background-color: white;
+            border-radius: 10px;
+            padding: 1.5rem;
+            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+            margin-bottom: 1rem;
+        }}
+
+        .option-grid {{
+            display: grid;
+            grid-template-columns: repeat(3, 1fr);
+            gap: 1rem;
+            margin-bottom: 1rem;
+        }}
+
+        .audio-player {{
+            background-color: rgba(67, 97, 238, 0.05);
+            border-radius: 10px;
+            padding: 1rem;
+        }}
+
+        /* Button styling */
+        .stButton button {{
+            background-color: var(--primary-color);
+            color: white;
+            border-radius: 5px;
+            transition: all 0.2s ease;
+        }}
+
+        .stButton button:hover {{
+            background-color: var(--secondary-color);
+            transform: translateY(-2px);
+        }}
+
+        /* Mobile responsiveness */
+        @media screen and (max-width: 640px) {{
+            .responsive-cols {{
+                flex-direction: column;
+            }}
+
+            .option-grid {{
+                grid-template-columns: 1fr;
+            }}
+        }}
+    </style>
+    """
+
+
+# --- Progress Indicator ---
+PROGRESS_STEPS = ["Upload", "Analysis Options", "Results"]
+
+
+@st.cache_data
+def _progress_html():
+    """Renders every (step index, state) variant of the progress indicator; cached across reruns."""
+    html = {}
+    for i, step in enumerate(PROGRESS_STEPS, 1):
+        html[(i, "done")] = f"<div style='text-align:center;'><span style='color:{PRIMARY_COLOR}; font-size:1.5rem;'>✓</span><br><span style='color:{PRIMARY_COLOR};'>{step}</span></div>"
+        html[(i, "active")] = f"<div style='text-align:center;'><span style='color:{PRIMARY_COLOR}; font-size:1.5rem; font-weight:bold;'>{i}</span><br><span style='color:{PRIMARY_COLOR}; font-weight:bold;'>{step}</span></div>"
+        html[(i, "todo")] = f"<div style='text-align:center;'><span style='color:gray; font-size:1.5rem;'>{i}</span><br><span style='color:gray;'>{step}</span></div>"
+    return html
+
+
+def _progress_state(i, current_step):
+    """Classifies step ``i`` relative to the current step."""
+    if i < current_step:
+        return "done"
+    if i == current_step:
+        return "active"
+    return "todo"
+
+
+@st.cache_data
+def _progress_row(current_step):
+    """Builds the full indicator row for the current step, so a rerun emits one cached markdown call."""
+    variants = _progress_html()
+    return ("<div style='display:flex; justify-content:space-around;'>"
+            + "".join(variants[(i, _progress_state(i, current_step))]
+                      for i in range(1, len(PROGRESS_STEPS) + 1))
+            + "</div>")
 
 
 # --- Prompts Dictionary ---
-def get_analysis_prompts(custom_query=""):
-    return {
-        "resume_review": """
+_STATIC_PROMPTS = {
+    "resume_review": """
 You are an experienced Hiring Manager and Resume Expert.
 Analyze the provided resume against the job description.
 Evaluate the following:
@@ -103,19 +536,19 @@ Evaluate the following:
 4. *Grammar & Professionalism:* Check for grammatical errors or unprofessional language.
 Provide a concise professional summary based on this evaluation.
 """,
-        "skill_improvement": """
+    "skill_improvement": """
 You are a Technical Recruiter and Career Advisor.
 Based on the resume and the target job description:
 1. Identify key skill gaps (both hard and soft skills).
 2. Suggest specific areas for skill improvement.
 3. Recommend relevant tools, programming languages, or platforms the candidate should consider learning or highlighting.
 """,
-        "missing_keywords": """
+    "missing_keywords": """
 You are an expert ATS (Applicant Tracking System) scanner.
 Compare the resume against the job description.
 List the top 10-15 most important keywords and phrases from the job description that are MISSING or underrepresented in the resume. Focus on skills, technologies, and qualifications mentioned in the job description.
 """,
-        "match_ats": """
+    "match_ats": """
 You are an advanced ATS simulator and Resume Analyst.
 Carefully compare the resume against the job description and provide the following:
 Before analysis, determine if the resume is for an intern or entry-level candidate. If yes, apply lenient scoring criteria based on early-career expectations (i.e., fewer years of experience, partial skills, learning potential). Interns can still have a high job match if they meet some key criteria.
@@ -135,7 +568,7 @@ Then, provide:
 5. Final Suggestions: Provide 2-3 concise, actionable tips for improvement based on the analysis.
         
 """,
-        "market_insights": """
+    "market_insights": """
 You are a Market Research Analyst specializing in HR and compensation.
 Based only on the provided Job Description:
 1. *Potential Salary Range:* Estimate a likely salary range for this type of role in a general market (mention it's an estimate for india).
@@ -143,20 +576,20 @@ Based only on the provided Job Description:
 3. *Potential Career Trajectory:* Briefly suggest 1-2 potential next steps or career growth opportunities typically following this role.
 Disclaimer: These are general insights based on the job description text and not real-time, location-specific market data.
 """,
-        "career_path": """
+    "career_path": """
 Act as a Career Coach. Based on the skills and experience outlined in the resume:
 1. Suggest 3-5 potential alternative or future career paths that align well with the candidate's profile.
 2. For each path, briefly explain why it's a suitable suggestion, linking it to specific skills or experiences in the resume.
 Consider both vertical and lateral moves.
 """,
-        "upskilling": """
+    "upskilling": """
 You are a Learning and Development Advisor.
 Based on the resume and the target job description:
 1. Identify 2-3 key skill gaps or areas for development.
 2. For each gap, suggest specific types of courses, certifications, or learning resources.
 3. Mention relevant online learning platforms (like Coursera, Udemy, edX, LinkedIn Learning, Pluralsight, etc.) where such courses might be found. Provide specific course name examples if possible.
 """,
-        "linkedin": """
+    "linkedin": """
 You are a LinkedIn Profile Optimization Expert and Professional Branding Coach.
 Based on the provided resume and targeting the job description, write a compelling and engaging LinkedIn 'About' section (summary) for the candidate.
 The summary should:
@@ -167,8 +600,12 @@ The summary should:
 5. Be professional and engaging.
 6. Include relevant keywords for discoverability.
 """,
-        "custom": custom_query
-    }
+}
+
+
+def get_prompt(option, custom_query=""):
+    """Returns the prompt for an analysis option; custom questions are used verbatim."""
+    return custom_query if option == "custom" else _STATIC_PROMPTS[option]
 
 
 # --- Main Application ---
@@ -187,94 +624,7 @@ def main():
         st.stop()
 
     # Custom CSS
-    st.markdown(f"""
-    <style>
-        :root {{
-            --primary-color: {PRIMARY_COLOR};
-            --secondary-color: {SECONDARY_COLOR};
-            --accent-color: {ACCENT_COLOR};
-            --background-color: {BG_COLOR};
-            --text-color: {TEXT_COLOR};
-        }}
-
-        .stApp {{
-            background-color: var(--background-color);
-            color: var(--text-color);
-        }}
-
-        h1, h2, h3 {{
-            color: var(--primary-color);
-        }}
-
-        .step-container {{
-            padding: 1rem;
-            border-radius: 10px;
-            margin-bottom: 1rem;
-            transition: all 0.3s ease;
-        }}
-
-        .step-active {{
-            background-color: rgba(67, 97, 238, 0.1);
-            border-left: 5px solid var(--primary-color);
-        }}
-
-        .step-completed {{
-            opacity: 0.7;
-        }}
-
-        .step-heading {{
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-        }}
-
-        .upload-area {{
-            border: 2px dashed rgba(67, 97, 238, 0.3);
-            border-radius: 10px;
-            padding: 2rem;
-            text-align: center;
-            transition: all 0.3s ease;
-        }}
-
-        .upload-area:hover {{
-            border-color: var(--primary-color);
-        }}
-
-        .result-card {{
-            background-color: white;
-            border-radius: 10px;
-            padding: 1.5rem;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-            margin-bottom: 1rem;
-        }}
-
-        .audio-player {{
-            background-color: rgba(67, 97, 238, 0.05);
-            border-radius: 10px;
-            padding: 1rem;
-        }}
-
-        /* Button styling */
-        .stButton button {{
-            background-color: var(--primary-color);
-            color: white;
-            border-radius: 5px;
-            transition: all 0.2s ease;
-        }}
-
-        .stButton button:hover {{
-            background-color: var(--secondary-color);
-            transform: translateY(-2px);
-        }}
-
-        /* Mobile responsiveness */
-        @media screen and (max-width: 640px) {{
-            .responsive-cols {{
-                flex-direction: column;
-            }}
-        }}
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(_css(), unsafe_allow_html=True)
 
     # Initialize session state
     if 'step' not in st.session_state:
@@ -295,43 +645,43 @@ def main():
     if 'analysis_result' not in st.session_state:
         st.session_state.analysis_result = None
 
-    if 'audio_path' not in st.session_state:
-        st.session_state.audio_path = None
+    if 'audio_error' not in st.session_state:
+        st.session_state.audio_error = None
+
+    if 'batch_job_name' not in st.session_state:
+        st.session_state.batch_job_name = None
+
+    if 'batch_submitted_at' not in st.session_state:
+        st.session_state.batch_submitted_at = None
+
+    if 'batch_options' not in st.session_state:
+        st.session_state.batch_options = []
+
+    if 'batch_results' not in st.session_state:
+        st.session_state.batch_results = None
+
+    if 'batch_error' not in st.session_state:
+        st.session_state.batch_error = None
 
     # Navigation functions
     def go_to_step(step):
         st.session_state.step = step
 
-    # Load animations
-    header_animation = load_lottie_animation("ani2.json")
-
     # --- Header ---
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        if header_animation:
-            st_lottie(header_animation, speed=1, height=180, key="header_animation")
+    # The animation is only shown on the landing step; later steps get the text header alone
+    if st.session_state.step == 1:
+        header_animation = load_lottie_animation("ani2.json")
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            if header_animation:
+                st_lottie(header_animation, speed=1, height=180, key="header_animation")
 
     st.markdown("<h1 style='text-align: center;'>JobFit AI</h1>", unsafe_allow_html=True)
     st.markdown("<p style='text-align: center; font-size: 1.2rem;'>Optimize your resume with AI-powered insights</p>",
                 unsafe_allow_html=True)
 
     # --- Progress Indicator ---
-    steps = ["Upload", "Analysis Options", "Results"]
-    cols = st.columns(len(steps))
-    for i, (col, step) in enumerate(zip(cols, steps), 1):
-        with col:
-            if i < st.session_state.step:
-                st.markdown(
-                    f"<div style='text-align:center;'><span style='color:{PRIMARY_COLOR}; font-size:1.5rem;'>✓</span><br><span style='color:{PRIMARY_COLOR};'>{step}</span></div>",
-                    unsafe_allow_html=True)
-            elif i == st.session_state.step:
-                st.markdown(
-                    f"<div style='text-align:center;'><span style='color:{PRIMARY_COLOR}; font-size:1.5rem; font-weight:bold;'>{i}</span><br><span style='color:{PRIMARY_COLOR}; font-weight:bold;'>{step}</span></div>",
-                    unsafe_allow_html=True)
-            else:
-                st.markdown(
-                    f"<div style='text-align:center;'><span style='color:gray; font-size:1.5rem;'>{i}</span><br><span style='color:gray;'>{step}</span></div>",
-                    unsafe_allow_html=True)
+    st.markdown(_progress_row(st.session_state.step), unsafe_allow_html=True)
 
     st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -339,41 +689,46 @@ def main():
     if st.session_state.step == 1:
         st.markdown("<h2>Step 1: Upload Your Documents</h2>", unsafe_allow_html=True)
 
-        col1, col2 = st.columns(2)
+        # A form defers reruns until submit, so the PDF is parsed once per Continue click
+        with st.form("step1", clear_on_submit=False):
+            col1, col2 = st.columns(2)
 
-        with col1:
-            st.markdown(
-                "<div class='step-heading'><span style='font-size:1.5rem;'>📄</span><h3>Upload Resume</h3></div>",
-                unsafe_allow_html=True)
-            uploaded_file = st.file_uploader(
-                "Select your resume (PDF format)",
-                type=["pdf"],
-                help="Upload your resume in PDF format"
-            )
+            with col1:
+                st.markdown(
+                    "<div class='step-heading'><span style='font-size:1.5rem;'>📄</span><h3>Upload Resume</h3></div>",
+                    unsafe_allow_html=True)
+                uploaded_file = st.file_uploader(
+                    "Select your resume (PDF format)",
+                    type=["pdf"],
+                    help="Upload your resume in PDF format"
+                )
+
+            with col2:
+                st.markdown(
+                    "<div class='step-heading'><span style='font-size:1.5rem;'>📋</span><h3>Job Description</h3></div>",
+                    unsafe_allow_html=True)
+                job_description = st.text_area(
+                    "Paste the job description",
+                    value=st.session_state.job_description,
+                    height=250,
+                    placeholder="Paste the full job description here..."
+                )
+
+            submitted = st.form_submit_button("Continue to Analysis Options", use_container_width=True)
 
+        if submitted:
+            st.session_state.job_description = job_description
+
+            # Without a new upload, keep the resume from an earlier submission
             if uploaded_file:
                 st.session_state.resume_content = extract_pdf_text(uploaded_file)
                 if st.session_state.resume_content:
                     st.success("✅ Resume uploaded successfully!")
-                else:
-                    st.error("❌ Failed to process the PDF. Please try again.")
-
-        with col2:
-            st.markdown(
-                "<div class='step-heading'><span style='font-size:1.5rem;'>📋</span><h3>Job Description</h3></div>",
-                unsafe_allow_html=True)
-            job_description = st.text_area(
-                "Paste the job description",
-                value=st.session_state.job_description,
-                height=250,
-                placeholder="Paste the full job description here..."
-            )
-
-            st.session_state.job_description = job_description
 
-        if st.button("Continue to Analysis Options", use_container_width=True):
             if not st.session_state.resume_content:
-                st.error("Please upload your resume to continue.")
+                # extract_pdf_text has already reported why an attached file was rejected
+                if not uploaded_file:
+                    st.error("Please upload your resume to continue.")
             elif not st.session_state.job_description.strip():
                 st.error("Please paste the job description to continue.")
             else:
@@ -432,37 +787,43 @@ def main():
             }
         }
 
-        # Create a more visually appealing selection mechanism with cards
-        cols = st.columns(3)
-        for i, (option_key, option_data) in enumerate(analysis_options.items()):
-            with cols[i % 3]:
-                card_style = """
-                    padding: 1rem;
-                    border-radius: 10px;
-                    margin-bottom: 1rem;
-                    border: 2px solid transparent;
-                    cursor: pointer;
-                    height: 140px;
-                    transition: all 0.2s ease;
-                """
-
-                # Highlight selected option
-                if st.session_state.analysis_option == option_key:
-                    card_style += f"border-color: {PRIMARY_COLOR}; background-color: rgba(67, 97, 238, 0.1);"
-                else:
-                    card_style += "border-color: #e0e0e0; background-color: white;"
-
-                st.markdown(f"""
-                <div style='{card_style}' onclick=''>
-                    <div style='font-size: 1.8rem; margin-bottom: 0.5rem;'>{option_data['icon']}</div>
-                    <div style='font-weight: bold; margin-bottom: 0.3rem;'>{option_data['title']}</div>
-                    <div style='font-size: 0.8rem; color: #666;'>{option_data['desc']}</div>
-                </div>
-                """, unsafe_allow_html=True)
-
-                # We need a button because the div onclick doesn't work in Streamlit
-                if st.button(f"Select {option_data['title']}", key=f"btn_{option_key}", use_container_width=True):
-                    st.session_state.analysis_option = option_key
+        # Card grid is filled after the radio so it highlights the current selection
+        card_grid = st.container()
+
+        # A single radio widget: one interaction, one rerun. Its key is stable so the widget
+        # keeps its identity; Streamlit drops the key on other steps, so re-seed it on return.
+        if 'analysis_option_radio' not in st.session_state:
+            st.session_state.analysis_option_radio = st.session_state.analysis_option
+        st.session_state.analysis_option = st.radio(
+            "Analysis type",
+            list(analysis_options),
+            format_func=lambda k: f"{analysis_options[k]['icon']} {analysis_options[k]['title']}",
+            index=None,
+            key="analysis_option_radio",
+            horizontal=True
+        )
+
+        # Render every card in one markdown call
+        html_parts = ["<div class='option-grid'>"]
+        for option_key, option_data in analysis_options.items():
+            card_style = "padding: 1rem; border-radius: 10px; border: 2px solid transparent; height: 140px; transition: all 0.2s ease;"
+
+            # Highlight selected option
+            if st.session_state.analysis_option == option_key:
+                card_style += f"border-color: {PRIMARY_COLOR}; background-color: rgba(67, 97, 238, 0.1);"
+            else:
+                card_style += "border-color: #e0e0e0; background-color: white;"
+
+            # Kept on unindented lines with no blank lines so markdown treats the whole grid as one HTML block
+            html_parts.append(
+                f"<div style='{card_style}'>"
+                f"<div style='font-size: 1.8rem; margin-bottom: 0.5rem;'>{option_data['icon']}</div>"
+                f"<div style='font-weight: bold; margin-bottom: 0.3rem;'>{option_data['title']}</div>"
+                f"<div style='font-size: 0.8rem; color: #666;'>{option_data['desc']}</div>"
+                "</div>"
+            )
+        html_parts.append("</div>")
+        card_grid.markdown("".join(html_parts), unsafe_allow_html=True)
 
         # Custom question input if selected
         if st.session_state.analysis_option == "custom":
@@ -473,6 +834,9 @@ def main():
                 placeholder="Type your specific question here..."
             )
 
+        # Full-width area for the streamed analysis, filled by the Analyze Now handler below
+        placeholder = st.empty()
+
         # Navigation buttons
         col1, col2 = st.columns(2)
         with col1:
@@ -489,29 +853,72 @@ def main():
                     # Perform analysis
                     with st.spinner("Analyzing your resume... This may take a moment."):
                         # Get the appropriate prompt
-                        prompts = get_analysis_prompts(st.session_state.custom_query)
-                        selected_prompt = prompts[st.session_state.analysis_option]
+                        selected_prompt = get_prompt(st.session_state.analysis_option, st.session_state.custom_query)
+
+                        # Stream response into the placeholder as chunks arrive
+                        audio_future = None
 
-                        # Generate response
-                        st.session_state.analysis_result = get_gemini_response(
+                        def on_chunk(text):
+                            nonlocal audio_future
+                            placeholder.markdown(text)
+                            # Start the audio summary as soon as enough text has streamed in
+                            if audio_future is None and len(text) >= AUDIO_SUMMARY_CHARS:
+                                audio_future = _get_executor().submit(speak_text, text[:AUDIO_SUMMARY_CHARS])
+
+                        result, error = get_gemini_response(
                             selected_prompt,
                             st.session_state.resume_content,
-                            st.session_state.job_description
+                            st.session_state.job_description,
+                            st.session_state.analysis_option,
+                            on_chunk
                         )
+                        if error:
+                            st.error(error)
+                        st.session_state.analysis_result = result
 
-                        # Generate audio summary (first 500 chars)
                         if st.session_state.analysis_result:
-                            if st.session_state.audio_path:
-                                cleanup_temp_file(st.session_state.audio_path)
-
-                            st.session_state.audio_path = speak_text(
-                                st.session_state.analysis_result[:500]
-                            )
+                            # Cached or short responses never crossed the threshold above
+                            if audio_future is None:
+                                audio_future = _get_executor().submit(speak_text, result[:AUDIO_SUMMARY_CHARS])
+                            # Wait for the audio cache to be warm before showing results;
+                            # Step 3 skips audio after a failure so a TTS outage cannot stall it
+                            _, st.session_state.audio_error = audio_future.result()
 
                             go_to_step(3)
                         else:
                             st.error("Failed to generate analysis. Please try again.")
 
+        # Batch several analyses into a single Gemini Batch API job
+        with st.expander("Run multiple analyses as a batch (lower cost, slower)"):
+            batch_cols = st.columns(3)
+            selected_options = [
+                option_key for i, option_key in enumerate(_STATIC_PROMPTS)
+                if batch_cols[i % 3].checkbox(analysis_options[option_key]['title'], key=f"batch_{option_key}")
+            ]
+
+            if st.button("Run all selected", use_container_width=True):
+                if not selected_options:
+                    st.error("Please select at least one analysis type.")
+                else:
+                    # Only one batch job is tracked at a time
+                    discard_batch_job()
+                    job_name, error = submit_batch_analysis(
+                        selected_options,
+                        st.session_state.resume_content,
+                        st.session_state.job_description
+                    )
+                    if error:
+                        st.error(error)
+                    else:
+                        st.session_state.batch_job_name = job_name
+                        st.session_state.batch_submitted_at = time.time()
+                        st.session_state.batch_options = selected_options
+
+        # Only poll on a timer while a job is pending; finished results render outside it
+        if st.session_state.batch_job_name and not st.session_state.batch_results:
+            st.fragment(poll_batch_job, run_every=_BATCH_POLL_SECONDS)()
+        render_batch_results(analysis_options)
+
     # --- Step 3: Results ---
     elif st.session_state.step == 3:
         st.markdown("<h2>Analysis Results</h2>", unsafe_allow_html=True)
@@ -530,10 +937,16 @@ def main():
             st.markdown("</div>", unsafe_allow_html=True)
 
             # Audio summary
-            if st.session_state.audio_path:
+            if st.session_state.audio_error:
+                st.warning(st.session_state.audio_error)
+                audio = None
+            else:
+                audio, st.session_state.audio_error = speak_text(
+                    st.session_state.analysis_result[:AUDIO_SUMMARY_CHARS])
+            if audio:
                 st.markdown("<h3>Audio Summary</h3>", unsafe_allow_html=True)
                 st.markdown("<div class='audio-player'>", unsafe_allow_html=True)
-                st.audio(st.session_state.audio_path, format="audio/mp3")
+                st.audio(audio, format="audio/mp3")
                 st.caption("Audio summary of the first portion of the analysis")
                 st.markdown("</div>", unsafe_allow_html=True)
 
@@ -545,14 +958,11 @@ def main():
 
             with col2:
                 if st.button("Start New Analysis", use_container_width=True):
-                    # Clean up
-                    if st.session_state.audio_path:
-                        cleanup_temp_file(st.session_state.audio_path)
-                        st.session_state.audio_path = None
-
                     # Reset state but keep documents
+                    discard_batch_job()
                     st.session_state.analysis_option = None
                     st.session_state.analysis_result = None
+                    st.session_state.audio_error = None
                     st.session_state.custom_query = ""
                     go_to_step(1)
 